@@ -6,7 +6,7 @@ import re
 from flask import Flask, request, jsonify, render_template, send_file, session
 from flask_cors import CORS
 from database import Database
-from validator import EmailValidator
+from validator import EmailValidator, check_syntax_batch, settle_deferred
 from auth import auth_bp, login_manager, setup_oauth
 from flask_login import current_user, login_required
 from dotenv import load_dotenv
@@ -53,15 +53,23 @@ async def verify_emails():
 
     # 3. Processing
     results = []
-    async def process_email(email):
-        # In a real hybrid setup, this would call the VPS worker for SMTP
-        status, details = await validator.validate(email)
+    async def process_email(email, normalized, syntax_error):
+        if syntax_error:
+            status, details = "Invalid", syntax_error
+        else:
+            # In a real hybrid setup, this would call the VPS worker for SMTP
+            status, details = await validator.validate(normalized, syntax_checked=True)
+            if status == "Deferred":
+                # No retry loop on serverless and nothing would update the logged row later,
+                # so temporary failures get their final answer right away
+                status = settle_deferred(details)
         db.log_verification(current_user.id, email, status, details)
         return {"email": email, "status": status, "details": details}
 
     # Gather results concurrently
     processed_count = len(emails)
-    results = await asyncio.gather(*(process_email(e) for e in emails))
+    syntax = check_syntax_batch([e.lower().strip() for e in emails])
+    results = await asyncio.gather(*(process_email(e, normalized, error) for e, (normalized, error) in zip(emails, syntax)))
     
     # Update credits
     if current_user.role != 'admin':
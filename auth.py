@@ -1,14 +1,17 @@
 import os
 from flask import Blueprint, url_for, redirect, session, flash, request
-from authlib.integrations.flask_client import OAuth
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user
 from database import Database
-from dotenv import load_dotenv
-
-load_dotenv()
 
 auth_bp = Blueprint('auth', __name__)
-db = Database("saas_results.db")
+_db = None
+
+def get_db():
+    # Created on first use so importing this module doesn't open a connection or run DDL
+    global _db
+    if _db is None:
+        _db = Database("saas_results.db")
+    return _db
 
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
@@ -37,6 +40,7 @@ def load_user(user_id):
     return None
 
 def setup_oauth(app):
+    from authlib.integrations.flask_client import OAuth
     oauth = OAuth(app)
     oauth.register(
         name='google',
@@ -69,8 +73,8 @@ def authorize():
         # Admin check
         role = 'admin' if email == os.getenv("ADMIN_EMAIL") else 'user'
         
-        db.create_or_update_user(email, name, picture, role)
-        user_row = db.get_user_by_email(email)
+        get_db().create_or_update_user(email, name, picture, role)
+        user_row = get_db().get_user_by_email(email)
         user_obj = User(user_row)
         login_user(user_obj)
         
@@ -86,7 +90,7 @@ def logout():
 @auth_bp.route('/dev-login')
 def dev_login():
     email = request.args.get('email', os.getenv("ADMIN_EMAIL"))
-    db.create_or_update_user(email, "Dev User", "", 'admin' if email == os.getenv("ADMIN_EMAIL") else 'user')
-    user_row = db.get_user_by_email(email)
+    get_db().create_or_update_user(email, "Dev User", "", 'admin' if email == os.getenv("ADMIN_EMAIL") else 'user')
+    user_row = get_db().get_user_by_email(email)
     login_user(User(user_row))
     return redirect('/')
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+# Cold-start budget per entry point, in milliseconds (override with the second CLI argument)
+TARGETS_MS = {
+    "main": 150,
+    "validator, database": 75,
+    "vps_worker": 400,
+}
+
+def import_time_ms(modules, rounds=5):
+    # Fresh interpreter each round so nothing is already cached in sys.modules
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {modules}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip()))
+    return min(samples)
+
+if __name__ == "__main__":
+    only = sys.argv[1] if len(sys.argv) > 1 else None
+    over = False
+    for modules, target in TARGETS_MS.items():
+        if only and only != modules:
+            continue
+        target = float(sys.argv[2]) if only and len(sys.argv) > 2 else target
+        try:
+            elapsed = import_time_ms(modules)
+        except subprocess.CalledProcessError as e:
+            # A missing dependency or broken lazy import fails the guard too
+            print(f"  {modules:<20} import failed: {e.stderr.strip().splitlines()[-1]}")
+            over = True
+            continue
+        status = "OK" if elapsed <= target else "OVER"
+        over = over or elapsed > target
+        print(f"  {modules:<20} {elapsed:7.1f} ms  (target {target:.0f} ms)  {status}")
+    sys.exit(1 if over else 0)
@@ -1,13 +1,22 @@
 import sqlite3
 import os
-import psycopg2
 from datetime import datetime
-from dotenv import load_dotenv
 
-load_dotenv()
+# Databases whose schema this process has already created (see _init_db)
+_initialized_schemas = set()
+_env_loaded = False
+
+def _load_env():
+    # Deferred from import time; .env only needs reading once per process
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 class Database:
     def __init__(self, db_path="saas_results.db"):
+        _load_env()
         self.db_url = os.getenv("DATABASE_URL")
         self.db_path = db_path
         self.is_memory = db_path == ":memory:"
@@ -26,10 +35,25 @@ class Database:
         if self.is_memory:
             return self._conn
         if self.is_postgres:
+            import psycopg2
             return psycopg2.connect(self.db_url)
         return sqlite3.connect(self.db_path, check_same_thread=False)
 
     def _init_db(self):
+        # Every Database() on the same backend shares one schema; only the first one
+        # in this process runs the DDL. In-memory databases are separate each time.
+        if self.is_memory:
+            self.migrate()
+            return
+        schema_key = self.db_url if self.is_postgres else self.db_path
+        if schema_key in _initialized_schemas:
+            return
+        # DB_AUTO_MIGRATE=false: the schema is managed explicitly with `python database.py`
+        if os.getenv("DB_AUTO_MIGRATE", "true").lower() != "false":
+            self.migrate()
+        _initialized_schemas.add(schema_key)
+
+    def migrate(self):
         conn = self._get_conn()
         cursor = conn.cursor()
         
@@ -82,6 +106,28 @@ class Database:
             )
         ''')
 
+        # Per-address results cache (Shared)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS email_cache (
+                email TEXT PRIMARY KEY,
+                status TEXT,
+                details TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Temporary SMTP failures (greylisting, timeouts) waiting for a retry
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS deferred_retries (
+                email TEXT PRIMARY KEY,
+                domain TEXT,
+                mx_host TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at DOUBLE PRECISION,
+                details TEXT
+            )
+        ''')
+
         conn.commit()
         if not self.is_memory: conn.close()
 
@@ -199,3 +245,82 @@ class Database:
         ''', [(d, category) for d in domains])
         conn.commit()
         if not self.is_memory: conn.close()
+
+    # Email Results Cache
+    def get_email_status(self, email):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f"SELECT status, details FROM email_cache WHERE email = {placeholder}", (email,))
+        res = cursor.fetchone()
+        if not self.is_memory: conn.close()
+        return res
+
+    def save_email_status(self, email, status, details):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f'''
+            INSERT INTO email_cache (email, status, details)
+            VALUES ({placeholder}, {placeholder}, {placeholder})
+            ON CONFLICT (email) DO UPDATE SET
+                status = EXCLUDED.status,
+                details = EXCLUDED.details,
+                timestamp = CURRENT_TIMESTAMP
+        ''', (email, status, details))
+        conn.commit()
+        if not self.is_memory: conn.close()
+
+    # Deferred Retry Queue
+    def save_deferred_retry(self, email, domain, mx_host, attempts, next_attempt_at, details):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f'''
+            INSERT INTO deferred_retries (email, domain, mx_host, attempts, next_attempt_at, details)
+            VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+            ON CONFLICT (email) DO UPDATE SET
+                mx_host = EXCLUDED.mx_host,
+                attempts = EXCLUDED.attempts,
+                next_attempt_at = EXCLUDED.next_attempt_at,
+                details = EXCLUDED.details
+        ''', (email, domain, mx_host, attempts, next_attempt_at, details))
+        conn.commit()
+        if not self.is_memory: conn.close()
+
+    def get_deferred_retry(self, email):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f"SELECT email, domain, mx_host, attempts, next_attempt_at, details FROM deferred_retries WHERE email = {placeholder}", (email,))
+        res = cursor.fetchone()
+        if not self.is_memory: conn.close()
+        return res
+
+    def get_due_retries(self, now, limit=100):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f'''
+            SELECT email, domain, mx_host, attempts, next_attempt_at, details
+            FROM deferred_retries
+            WHERE next_attempt_at <= {placeholder}
+            ORDER BY next_attempt_at LIMIT {placeholder}
+        ''', (now, limit))
+        rows = cursor.fetchall()
+        if not self.is_memory: conn.close()
+        return rows
+
+    def delete_deferred_retry(self, email):
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        placeholder = "%s" if self.is_postgres else "?"
+        cursor.execute(f"DELETE FROM deferred_retries WHERE email = {placeholder}", (email,))
+        conn.commit()
+        if not self.is_memory: conn.close()
+
+if __name__ == "__main__":
+    # Explicit migration for deployments that set DB_AUTO_MIGRATE=false
+    os.environ.setdefault("DB_AUTO_MIGRATE", "false")
+    Database().migrate()
+    print("Schema is up to date.")
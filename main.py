@@ -3,7 +3,8 @@ import csv
 import time
 from collections import Counter
 from database import Database
-from validator import EmailValidator
+from validator import EmailValidator, check_syntax_batch
+from retry_scheduler import DeferredRetryScheduler
 from rich.console import Console
 from rich.layout import Layout
 from rich.live import Live
@@ -15,7 +16,7 @@ console = Console()
 
 class Dashboard:
     def __init__(self, total):
-        self.stats = Counter({"Total": total, "Valid": 0, "Invalid": 0, "Risky": 0, "Error": 0, "Cached": 0})
+        self.stats = Counter({"Total": total, "Valid": 0, "Invalid": 0, "Risky": 0, "Error": 0, "Deferred": 0, "Cached": 0})
         self.processed = 0
         self.start_time = time.time()
 
@@ -25,6 +26,11 @@ class Dashboard:
         if is_cached:
             self.stats["Cached"] += 1
 
+    def resolve_deferred(self, status):
+        # A deferred address got its final answer from the retry scheduler
+        self.stats["Deferred"] -= 1
+        self.stats[status] += 1
+
     def generate_layout(self, progress_table):
         layout = Layout()
         layout.split_column(
@@ -68,27 +74,33 @@ class Dashboard:
 
 async def worker(queue, validator, db, dashboard, progress, task_id):
     while True:
-        email = await queue.get()
-        if email is None:
+        item = await queue.get()
+        if item is None:
             queue.task_done()
             break
+        # Raw address for the report, normalized one from the syntax pre-filter for everything else
+        email, normalized = item
             
-        cached = db.get_email_status(email)
+        cached = db.get_email_status(normalized)
         if cached:
             status, details = cached
             dashboard.update(status, is_cached=True)
         else:
-            status, details = await validator.validate(email)
-            db.save_email_status(email, status, details)
+            status, details = await validator.validate(normalized, syntax_checked=True)
+            # Deferred results were handed to the retry scheduler; don't cache them as final
+            if status != "Deferred":
+                db.save_email_status(normalized, status, details)
             dashboard.update(status)
             
         progress.update(task_id, advance=1)
         queue.task_done()
         result = (email, status, details)
         # We could yield this or save to a shared list
+        _result_index.setdefault(normalized, []).append(len(_results))
         _results.append(result)
 
 _results = []
+_result_index = {} # normalized address -> positions in _results
 
 async def main(input_file, output_file, worker_count=50):
     db = Database()
@@ -97,6 +109,13 @@ async def main(input_file, output_file, worker_count=50):
     # Mock RAG setup
     db.add_domain_knowledge(["mailinator.com", "temp-mail.org"], "disposable")
 
+    def on_resolved(email, status, details):
+        # Update this run's results in place; retries left over from earlier runs only touch the cache
+        for i in _result_index.get(email, []):
+            if _results[i][1] == "Deferred":
+                _results[i] = (_results[i][0], status, details)
+                dashboard.resolve_deferred(status)
+
     emails = []
     try:
         with open(input_file, 'r', encoding='utf-8') as f:
@@ -113,8 +132,16 @@ async def main(input_file, output_file, worker_count=50):
     dashboard = Dashboard(total)
     queue = asyncio.Queue()
     
-    for e in emails:
-        await queue.put(e)
+    # Reject malformed addresses in bulk so they never take a queue slot
+    rejected = 0
+    syntax = check_syntax_batch([e.lower().strip() for e in emails])
+    for e, (normalized, error) in zip(emails, syntax):
+        if error:
+            rejected += 1
+            dashboard.update("Invalid")
+            _results.append((e, "Invalid", error))
+        else:
+            await queue.put((e, normalized))
     
     # Add termination signals
     for _ in range(worker_count):
@@ -127,8 +154,12 @@ async def main(input_file, output_file, worker_count=50):
         TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
         TimeRemainingColumn(),
     )
-    task_id = progress.add_task("Verifying...", total=total)
+    task_id = progress.add_task("Verifying...", total=total, completed=rejected)
     
+    scheduler = DeferredRetryScheduler(db, validator, on_resolved=on_resolved)
+    validator.retry_scheduler = scheduler
+    scheduler.start()
+
     with Live(dashboard.generate_layout(progress), refresh_per_second=4, screen=True) as live:
         workers = [
             asyncio.create_task(worker(queue, validator, db, dashboard, progress, task_id))
@@ -141,6 +172,9 @@ async def main(input_file, output_file, worker_count=50):
             
         await asyncio.gather(*workers)
 
+    # Don't hold the run open for greylisted hosts; pending retries are persisted for the next run
+    await scheduler.stop()
+
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(["Email", "Status", "Details"])
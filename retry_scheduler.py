@@ -0,0 +1,100 @@
+import asyncio
+import time
+from validator import settle_deferred
+
+class DeferredRetryScheduler:
+    def __init__(self, db, validator, on_resolved=None, base_delay=60, max_delay=3600,
+                 max_attempts=5, concurrency=10, poll_interval=1.0):
+        self.db = db
+        self.validator = validator
+        self.on_resolved = on_resolved # called as on_resolved(email, status, details)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._domain_failures = {} # domain -> retry waves in a row that came back Deferred
+        self._domain_waves = {} # domain -> last wave that bumped _domain_failures
+        self._wave = 0
+        self._in_flight = set()
+        self._tasks = set()
+        self._loop_task = None
+
+    def _backoff(self, domain, attempts):
+        # Backoff grows with whichever is worse: this address or its whole domain
+        failures = max(attempts, self._domain_failures.get(domain, 0))
+        return min(self.max_delay, self.base_delay * (2 ** max(failures - 1, 0)))
+
+    def defer(self, email, mx_host, details, attempts=0, now=None):
+        # email is the normalized address and mx_host the MX validate() actually talked to
+        now = time.time() if now is None else now
+        domain = email.rsplit('@', 1)[1]
+
+        if attempts >= self.max_attempts:
+            # Out of retries: settle on the answer this failure type got before retries existed
+            self._resolve(email, settle_deferred(details), f"{details} (gave up after {attempts} retries)")
+            return
+
+        next_attempt_at = now + self._backoff(domain, attempts + 1)
+        existing = self.db.get_deferred_retry(email)
+        if existing:
+            # Seen again while pending (another upload or run): keep its retry count and schedule
+            attempts = max(attempts, existing[3])
+            next_attempt_at = max(next_attempt_at, existing[4])
+        self.db.save_deferred_retry(email, domain, mx_host, attempts, next_attempt_at, details)
+
+    def _resolve(self, email, status, details):
+        self.db.delete_deferred_retry(email)
+        self.db.save_email_status(email, status, details)
+        if self.on_resolved:
+            self.on_resolved(email, status, details)
+
+    async def _retry(self, row, wave):
+        email, domain, mx_host, attempts, _, _ = row
+        try:
+            async with self._semaphore:
+                status, details = await self.validator.check_smtp(email, mx_host)
+            if status == "Deferred":
+                # The domain backs off once per failed wave, however many of its addresses were in it
+                if self._domain_waves.get(domain) != wave:
+                    self._domain_waves[domain] = wave
+                    self._domain_failures[domain] = self._domain_failures.get(domain, 0) + 1
+                self.defer(email, mx_host, details, attempts=attempts + 1)
+            else:
+                self._domain_failures.pop(domain, None)
+                self._resolve(email, status, details)
+        finally:
+            self._in_flight.discard(email)
+
+    def run_due(self, now=None):
+        # Each retry runs as its own task so one slow host never holds up the rest
+        now = time.time() if now is None else now
+        self._wave += 1
+        started = []
+        for row in self.db.get_due_retries(now):
+            if row[0] in self._in_flight:
+                continue
+            self._in_flight.add(row[0])
+            task = asyncio.create_task(self._retry(row, self._wave))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started.append(task)
+        return started
+
+    async def _run(self):
+        while True:
+            self.run_due()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Anything still pending stays in the deferred_retries table for the next run
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
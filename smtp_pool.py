@@ -0,0 +1,244 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+import aiosmtplib
+
+class PooledSession:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.reused = False # handed out from the idle pool rather than freshly connected
+
+async def open_smtp_session(mx_host):
+    smtp = aiosmtplib.SMTP(hostname=mx_host, port=25, timeout=10)
+    await smtp.connect()
+    await smtp.ehlo()
+    return smtp
+
+class SMTPSessionPool:
+    # Keeps connected, EHLO'd sessions to the busiest MX hosts so a /verify call
+    # can go straight to MAIL FROM / RCPT TO instead of paying connect + banner + EHLO.
+    def __init__(self, connect=open_smtp_session, max_hosts=32, max_idle_per_host=4,
+                 warm_hosts=8, keepalive_after=30, max_age=300, max_uses=50, refresh_interval=5):
+        self.connect = connect
+        self.max_hosts = max_hosts
+        self.max_idle_per_host = max_idle_per_host
+        self.warm_hosts = warm_hosts # how many of the most requested hosts keep a session ready
+        self.keepalive_after = keepalive_after # NOOP idle sessions well before typical server idle timeouts
+        self.max_age = max_age
+        self.max_uses = max_uses # stay under per-connection RCPT limits of the big providers
+        self.refresh_interval = refresh_interval
+        self._idle = OrderedDict() # mx -> deque of PooledSession, least recently used host first
+        self._demand = Counter()
+        self._warm_failed = {} # mx -> monotonic time of the last failed warm-up
+        self._pending = Counter() # mx -> keepalives/warm-ups in flight, so warm-up doesn't double up
+        self._tasks = set()
+        self._refresher = None
+        self._closed = False # set by stop(): late RSET/NOOP/warm-up results are closed, not pooled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0 # reused sessions the server had already dropped
+
+    @asynccontextmanager
+    async def session(self, mx_host, sender):
+        # Yields a session whose MAIL FROM was already accepted. Healthy sessions (including
+        # ones that got a 4xx/5xx reply) go back to the pool; connection-level failures are dropped.
+        pooled = await self._begin(mx_host, sender)
+        try:
+            yield pooled.smtp
+        except aiosmtplib.SMTPResponseException:
+            self.release(mx_host, pooled)
+            raise
+        except BaseException:
+            self._close(pooled)
+            raise
+        else:
+            self.release(mx_host, pooled)
+
+    async def _begin(self, mx_host, sender):
+        pooled = await self.acquire(mx_host)
+        try:
+            await self._mail(mx_host, pooled, sender)
+            return pooled
+        except Exception as e:
+            # A reused session may have been dropped while idle (NAT timeout, unsolicited
+            # "421 idle timeout"). That says nothing about this request, so retry once fresh.
+            dropped = not isinstance(e, aiosmtplib.SMTPResponseException) or e.code == 421
+            if not (pooled.reused and dropped):
+                raise
+        self.hits -= 1
+        self.misses += 1
+        self.stale += 1
+        pooled = PooledSession(await self.connect(mx_host))
+        await self._mail(mx_host, pooled, sender)
+        return pooled
+
+    async def _mail(self, mx_host, pooled, sender):
+        try:
+            await pooled.smtp.mail(sender)
+        except aiosmtplib.SMTPResponseException as e:
+            if e.code == 421:
+                # The server is closing the connection
+                self._close(pooled)
+            else:
+                self.release(mx_host, pooled)
+            raise
+        except BaseException:
+            self._close(pooled)
+            raise
+
+    async def acquire(self, mx_host):
+        self._demand[mx_host] += 1
+        sessions = self._idle.get(mx_host)
+        while sessions:
+            pooled = sessions.pop() # most recently used first: least likely to have timed out
+            if not sessions:
+                # Don't let a host with nothing idle hold a max_hosts slot
+                del self._idle[mx_host]
+            if self._usable(pooled):
+                if sessions:
+                    self._idle.move_to_end(mx_host)
+                pooled.reused = True
+                self.hits += 1
+                return pooled
+            self._close(pooled)
+        self.misses += 1
+        return PooledSession(await self.connect(mx_host))
+
+    def release(self, mx_host, pooled):
+        # RSET off the request's critical path, then hand the session back
+        pooled.uses += 1
+        self._spawn(self._reset_and_return(mx_host, pooled))
+
+    async def _reset_and_return(self, mx_host, pooled):
+        try:
+            await pooled.smtp.rset()
+        except Exception:
+            self._close(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        self._put(mx_host, pooled)
+
+    def _put(self, mx_host, pooled):
+        if self._closed or not self._usable(pooled):
+            self._close(pooled)
+            return
+        sessions = self._idle.setdefault(mx_host, deque())
+        self._idle.move_to_end(mx_host)
+        sessions.append(pooled)
+        while len(sessions) > self.max_idle_per_host:
+            self._close(sessions.popleft())
+            self.evictions += 1
+        while len(self._idle) > self.max_hosts:
+            _, evicted = self._idle.popitem(last=False)
+            for stale in evicted:
+                self._close(stale)
+                self.evictions += 1
+
+    def _usable(self, pooled):
+        return (pooled.smtp.is_connected and pooled.uses < self.max_uses
+                and time.monotonic() - pooled.created_at < self.max_age)
+
+    def _close(self, pooled):
+        if pooled.smtp.is_connected:
+            self._spawn(self._quit(pooled.smtp))
+
+    async def _quit(self, smtp):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def refresh(self):
+        now = time.monotonic()
+        for mx_host, sessions in list(self._idle.items()):
+            for pooled in list(sessions):
+                if not self._usable(pooled):
+                    sessions.remove(pooled)
+                    self._close(pooled)
+                elif now - pooled.last_used >= self.keepalive_after:
+                    # Take it out while the NOOP is in flight so no request picks it up
+                    sessions.remove(pooled)
+                    self._pending[mx_host] += 1
+                    self._spawn(self._keepalive(mx_host, pooled))
+            if not sessions and mx_host in self._idle:
+                del self._idle[mx_host]
+
+        # Keep at least one ready session to each of the most requested hosts
+        for mx_host, _ in self._demand.most_common(self.warm_hosts):
+            failed_at = self._warm_failed.get(mx_host)
+            if (not self._idle.get(mx_host) and not self._pending[mx_host]
+                    and (failed_at is None or now - failed_at >= self.max_age)):
+                self._pending[mx_host] += 1
+                self._spawn(self._warm(mx_host))
+
+    async def _keepalive(self, mx_host, pooled):
+        try:
+            await pooled.smtp.noop()
+        except Exception:
+            self._close(pooled)
+            return
+        finally:
+            self._pending[mx_host] -= 1
+        pooled.last_used = time.monotonic()
+        self._put(mx_host, pooled)
+
+    async def _warm(self, mx_host):
+        try:
+            pooled = PooledSession(await self.connect(mx_host))
+        except Exception:
+            # Don't keep hammering a host that refuses us; requests still connect on demand
+            self._warm_failed[mx_host] = time.monotonic()
+            return
+        finally:
+            self._pending[mx_host] -= 1
+        self._warm_failed.pop(mx_host, None)
+        self._put(mx_host, pooled)
+
+    async def _run(self):
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+            ticks += 1
+            if ticks % 12 == 0:
+                # Decay demand so the warm set follows recent traffic
+                self._demand = Counter({h: c // 2 for h, c in self._demand.items() if c > 1})
+
+    def start(self):
+        self._closed = False
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._closed = True
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        for sessions in self._idle.values():
+            for pooled in sessions:
+                self._close(pooled)
+        self._idle.clear()
+        # In-flight RSET/NOOP/warm-ups finish into _close(), which spawns QUIT tasks of its own
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "stale": self.stale,
+            "idle_sessions": {mx: len(sessions) for mx, sessions in self._idle.items()},
+        }
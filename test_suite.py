@@ -1,9 +1,17 @@
 import random
 import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
 import asyncio
-from validator import EmailValidator
+from email_validator import validate_email, EmailNotValidError
+from validator import EmailValidator, check_syntax_batch
 from database import Database
+from retry_scheduler import DeferredRetryScheduler
+from smtp_pool import SMTPSessionPool
 
 def generate_mock_csv(filename, count=1000):
     domains = ["gmail.com", "yahoo.com", "outlook.com", "mailinator.com", "nonexistent-xyz-123.com"]
@@ -14,6 +22,70 @@ def generate_mock_csv(filename, count=1000):
             domain = random.choice(domains)
             writer.writerow([f"{user}@{domain}"])
 
+def generate_syntax_corpus(count=20000, seed=1337):
+    # Mostly well-formed lowercase ASCII, salted with the edge cases the fast path hands off
+    rng = random.Random(seed)
+    local_chars = "abcdefghijklmnopqrstuvwxyz0123456789._+-'!#$%&*/=?^`{|}~"
+    noise_chars = ' "<>()[],;:\\@.-_é日ß＠\u0301\t'
+    tlds = ["com", "org", "io", "co.uk", "xyz", "a", "1", "c0m", "museum", "test", "local",
+            "localhost", "invalid", "onion", "arpa", "xn--p1ai", "xn--zz", "ab--cd", "-bad", "bad-", "x" * 64]
+    labels = ["gmail", "yahoo", "mail-server", "a", "9", "ex--ample", "xn--bcher-kva", "bücher",
+              "-lead", "trail-", "y" * 63, "z" * 64, "sub.domain", "UPPER"]
+    corpus = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            first, last = (rng.choice(["john", "maria", "li", "o'neil", "dev+ops"]) for _ in range(2))
+            corpus.append(f"{first}.{last}{rng.randint(0, 999)}@{rng.choice(labels[:4])}.{rng.choice(tlds[:6])}")
+            continue
+        local = "".join(rng.choice(local_chars) for _ in range(rng.randint(0, 20)))
+        if rng.random() < 0.02:
+            local = "l" * rng.choice([64, 65, 200])
+        domain = ".".join(rng.choice(labels) for _ in range(rng.randint(1, 3)))
+        domain = f"{domain}.{rng.choice(tlds)}" if rng.random() < 0.95 else domain
+        email = f"{local}@{domain}"
+        roll = rng.random()
+        if roll < 0.6:
+            pass
+        elif roll < 0.75:
+            pos = rng.randint(0, len(email))
+            email = email[:pos] + rng.choice(noise_chars) + email[pos:]
+        elif roll < 0.85:
+            email = email.replace("@", rng.choice(["", "@@", "＠", " @"]), 1)
+        elif roll < 0.9:
+            email = rng.choice([f"{local}@", f"@{domain}", "", "@", f'"{local}"@{domain}', f"Name <{email}>"])
+        else:
+            email = email.lower().replace(".", rng.choice(["..", ".", "。"]), 1)
+        corpus.append(email)
+    return corpus
+
+class FakeSMTP:
+    def __init__(self):
+        self.is_connected = True
+        self.noops = 0
+        self.mail_error = None
+
+    async def mail(self, sender):
+        if self.mail_error:
+            raise self.mail_error
+        return 250, "OK"
+
+    async def rset(self):
+        pass
+
+    async def noop(self):
+        self.noops += 1
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+async def drain(pool):
+    # Wait for background RSET/NOOP/QUIT tasks, including ones they spawn
+    while pool._tasks:
+        await asyncio.gather(*list(pool._tasks))
+
 class TestEmailSaaS(unittest.TestCase):
     def setUp(self):
         self.db = Database(":memory:")
@@ -34,5 +106,256 @@ class TestEmailSaaS(unittest.TestCase):
         self.assertEqual(updated[6], 4000)
         # Verify it logic in app.py would block this, but here we just verify the state
 
+    def test_fast_syntax_matches_full_parser(self):
+        corpus = generate_syntax_corpus()
+        expected = []
+        for email in corpus:
+            try:
+                expected.append((validate_email(email, check_deliverability=False).normalized, None))
+            except EmailNotValidError as e:
+                expected.append((None, str(e)))
+        for email, got, want in zip(corpus, check_syntax_batch(corpus), expected):
+            self.assertEqual(got, want, email)
+
+    def test_validate_skips_syntax_for_prefiltered_addresses(self):
+        import validator
+        self.db.add_domain_knowledge(["bücher.de"], "disposable")
+        [(normalized, error)] = check_syntax_batch(["josé@xn--bcher-kva.de"])
+        check_syntax = validator.check_syntax
+        validator.check_syntax = lambda email: self.fail("syntax re-checked after the batch pre-filter")
+        try:
+            status, details = asyncio.run(self.validator.validate(normalized, syntax_checked=True))
+        finally:
+            validator.check_syntax = check_syntax
+        self.assertIsNone(error)
+        self.assertEqual((status, details), ("Risky", "Domain flagged as disposable"))
+
+    def test_null_mx_domain_is_invalid(self):
+        import dns.resolver
+        class NullMX:
+            exchange = "."
+        async def check_smtp(email, mx_host):
+            self.fail(f"SMTP attempted against {mx_host!r}")
+        self.validator.check_smtp = check_smtp
+        resolve = dns.resolver.resolve
+        dns.resolver.resolve = lambda domain, rdtype: [NullMX()]
+        try:
+            status, _ = asyncio.run(self.validator.validate("a@parked-example.com"))
+        finally:
+            dns.resolver.resolve = resolve
+        self.assertEqual(status, "Invalid")
+        self.assertEqual(self.db.get_domain_info("parked-example.com"), (0, ""))
+
+    def test_cold_start_skips_backend_imports(self):
+        # A cache-served CLI run must not pay for the SMTP/DNS/HTTP/Postgres stacks
+        code = ("import sys, main; from database import Database; from validator import EmailValidator; "
+                "EmailValidator(Database(':memory:')); "
+                "print(','.join(m for m in ('psycopg2', 'requests', 'aiosmtplib', 'dns', 'email_validator') if m in sys.modules))")
+        out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+    def test_schema_initialized_once_per_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "schema.db")
+            Database(path)
+            migrate = Database.migrate
+            Database.migrate = lambda db: self.fail("schema DDL ran twice")
+            try:
+                Database(path).get_user_by_email("nobody@rocket.com")
+            finally:
+                Database.migrate = migrate
+
+    def test_smtp_pool_reuses_and_evicts(self):
+        opened = []
+        async def connect(mx_host):
+            opened.append(mx_host)
+            return FakeSMTP()
+        pool = SMTPSessionPool(connect=connect, max_hosts=2, max_idle_per_host=1)
+
+        async def run():
+            for _ in range(2):
+                async with pool.session("gmail-smtp-in.l.google.com", "verify@rocket.com"):
+                    pass
+                await drain(pool)
+            self.assertEqual(opened, ["gmail-smtp-in.l.google.com"])
+
+            # Two concurrent lookups need two sessions, but only one stays idle
+            first = await pool.acquire("gmail-smtp-in.l.google.com")
+            self.assertEqual(pool.stats()["idle_sessions"], {})  # no empty deque left behind
+            second = await pool.acquire("gmail-smtp-in.l.google.com")
+            pool.release("gmail-smtp-in.l.google.com", first)
+            pool.release("gmail-smtp-in.l.google.com", second)
+            await drain(pool)
+            self.assertEqual(pool.stats()["idle_sessions"], {"gmail-smtp-in.l.google.com": 1})
+
+            # A connection-level failure drops the session instead of pooling it
+            with self.assertRaises(ConnectionError):
+                async with pool.session("mx.yahoo.com", "verify@rocket.com"):
+                    raise ConnectionError("reset by peer")
+            await drain(pool)
+            self.assertNotIn("mx.yahoo.com", pool.stats()["idle_sessions"])
+
+            # Least recently used host goes first once max_hosts is exceeded
+            for mx_host in ("mx.yahoo.com", "mx.outlook.com"):
+                async with pool.session(mx_host, "verify@rocket.com"):
+                    pass
+            await drain(pool)
+            self.assertEqual(list(pool.stats()["idle_sessions"]), ["mx.yahoo.com", "mx.outlook.com"])
+            await pool.stop()
+        asyncio.run(run())
+
+        stats = pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 5))
+        self.assertEqual(stats["hit_rate"], round(2 / 7, 4))
+
+    def test_smtp_pool_retries_dropped_session_once(self):
+        import aiosmtplib
+        opened = []
+        async def connect(mx_host):
+            opened.append(FakeSMTP())
+            return opened[-1]
+        pool = SMTPSessionPool(connect=connect)
+
+        async def run():
+            async with pool.session("mx.outlook.com", "verify@rocket.com"):
+                pass
+            await drain(pool)
+            # The server dropped the idle session; the request must not see that
+            opened[0].mail_error = aiosmtplib.SMTPServerDisconnected("Connection lost")
+            async with pool.session("mx.outlook.com", "verify@rocket.com") as smtp:
+                self.assertIs(smtp, opened[1])
+            await drain(pool)
+            self.assertFalse(opened[0].is_connected)
+
+            # A real refusal is the request's answer even on a reused session, so no retry
+            opened[1].mail_error = aiosmtplib.SMTPSenderRefused(553, "Sender rejected", "verify@rocket.com")
+            with self.assertRaises(aiosmtplib.SMTPSenderRefused):
+                async with pool.session("mx.outlook.com", "verify@rocket.com"):
+                    pass
+            await pool.stop()
+        asyncio.run(run())
+
+        self.assertEqual(len(opened), 2)
+        stats = pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stale"]), (1, 2, 1))
+
+    def test_smtp_pool_stop_quits_in_flight_sessions(self):
+        opened = []
+        async def connect(mx_host):
+            opened.append(FakeSMTP())
+            return opened[-1]
+        pool = SMTPSessionPool(connect=connect)
+
+        async def run():
+            # Released just before shutdown: its RSET is still in flight when stop() runs
+            async with pool.session("mx.outlook.com", "verify@rocket.com"):
+                pass
+            await pool.stop()
+        asyncio.run(run())
+
+        self.assertEqual(pool.stats()["idle_sessions"], {})
+        self.assertFalse(opened[0].is_connected)
+
+    def test_smtp_pool_keepalive_and_warm_up(self):
+        async def connect(mx_host):
+            return FakeSMTP()
+        pool = SMTPSessionPool(connect=connect, keepalive_after=0)
+
+        async def run():
+            async with pool.session("mx.outlook.com", "verify@rocket.com") as smtp:
+                pass
+            await drain(pool)
+            await pool.refresh()
+            await drain(pool)
+            self.assertEqual(smtp.noops, 1)
+
+            # A frequently requested host with nothing idle gets a session opened ahead of time
+            pool._demand["mx.yahoo.com"] += 5
+            await pool.refresh()
+            await drain(pool)
+            self.assertEqual(pool.stats()["idle_sessions"], {"mx.outlook.com": 1, "mx.yahoo.com": 1})
+            await pool.stop()
+        asyncio.run(run())
+
+    def test_deferred_retry_resolves_in_place(self):
+        replies = [("Deferred", "SMTP Temporary Failure: 451 greylisted"), ("Valid", "SMTP Verified")]
+        async def check_smtp(email, mx_host):
+            return replies.pop(0)
+        self.validator.check_smtp = check_smtp
+        resolved = []
+        scheduler = DeferredRetryScheduler(self.db, self.validator, base_delay=10,
+                                           on_resolved=lambda *r: resolved.append(r))
+
+        async def run():
+            scheduler.defer("grey@example.com", "mx.example.com", "SMTP Temporary Failure: 451", now=0)
+            self.assertEqual(scheduler.run_due(now=5), [])  # not eligible yet
+            await asyncio.gather(*scheduler.run_due(now=10))
+            # Still greylisted: pushed back with a longer domain-wide backoff
+            row = self.db.get_deferred_retry("grey@example.com")
+            self.assertEqual(row[3], 1)
+            await asyncio.gather(*scheduler.run_due(now=row[4]))
+        asyncio.run(run())
+
+        self.assertEqual(resolved, [("grey@example.com", "Valid", "SMTP Verified")])
+        self.assertIsNone(self.db.get_deferred_retry("grey@example.com"))
+        self.assertEqual(self.db.get_email_status("grey@example.com"), ("Valid", "SMTP Verified"))
+
+    def test_deferred_mixed_case_address_keeps_mx(self):
+        self.db.save_domain_cache("gmail.com", True, "gmail-smtp-in.l.google.com")
+        attempts = []
+        async def check_smtp(email, mx_host):
+            attempts.append((email, mx_host))
+            return "Deferred", "SMTP Temporary Failure: 451 greylisted"
+        self.validator.check_smtp = check_smtp
+        self.validator.retry_scheduler = DeferredRetryScheduler(self.db, self.validator)
+
+        status, _ = asyncio.run(self.validator.validate("John@Gmail.com"))
+        self.assertEqual(status, "Deferred")
+        row = self.db.get_deferred_retry("john@gmail.com")
+        self.assertEqual(row[1:3], ("gmail.com", "gmail-smtp-in.l.google.com"))
+        self.assertEqual(attempts, [("john@gmail.com", "gmail-smtp-in.l.google.com")])
+
+    def test_revalidating_pending_address_keeps_retry_state(self):
+        self.db.save_domain_cache("gmail.com", True, "gmail-smtp-in.l.google.com")
+        async def check_smtp(email, mx_host):
+            return "Deferred", "SMTP Temporary Failure: 451 greylisted"
+        self.validator.check_smtp = check_smtp
+        self.validator.retry_scheduler = DeferredRetryScheduler(self.db, self.validator)
+        later = time.time() + 3000
+        self.db.save_deferred_retry("john@gmail.com", "gmail.com", "gmail-smtp-in.l.google.com", 3, later, "451")
+
+        asyncio.run(self.validator.validate("john@gmail.com"))
+        row = self.db.get_deferred_retry("john@gmail.com")
+        self.assertEqual((row[3], row[4]), (3, later))
+
+    def test_domain_backoff_grows_per_wave_not_per_address(self):
+        async def check_smtp(email, mx_host):
+            return "Deferred", "SMTP Temporary Failure: 451 greylisted"
+        self.validator.check_smtp = check_smtp
+        scheduler = DeferredRetryScheduler(self.db, self.validator, base_delay=60)
+        emails = [f"user{i}@gmail.com" for i in range(8)]
+
+        async def run():
+            for email in emails:
+                scheduler.defer(email, "gmail-smtp-in.l.google.com", "451", now=0)
+            # Every first-time deferral in the batch waits the base delay
+            self.assertEqual({self.db.get_deferred_retry(e)[4] for e in emails}, {60})
+            await asyncio.gather(*scheduler.run_due(now=60))
+        asyncio.run(run())
+
+        # One failed wave doubles the delay once for the whole domain
+        delays = {round(self.db.get_deferred_retry(e)[4] - time.time()) for e in emails}
+        self.assertEqual(delays, {120})
+
+    def test_deferred_retry_gives_up(self):
+        scheduler = DeferredRetryScheduler(self.db, self.validator, max_attempts=2)
+        scheduler.defer("slow@example.com", "mx.example.com", "SMTP Timeout: timed out", attempts=2)
+        scheduler.defer("grey@example.com", "mx.example.com", "SMTP Temporary Failure: 451 greylisted", attempts=2)
+        self.assertIsNone(self.db.get_deferred_retry("slow@example.com"))
+        # Each failure type settles on the status it had before retries existed
+        self.assertEqual(self.db.get_email_status("slow@example.com")[0], "Error")
+        self.assertEqual(self.db.get_email_status("grey@example.com")[0], "Risky")
+
 if __name__ == "__main__":
     unittest.main()
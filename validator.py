@@ -1,28 +1,76 @@
 import re
 import asyncio
-import dns.resolver
-import aiosmtplib
-import requests
 import os
-from email_validator import validate_email, EmailNotValidError
+
+# dns.resolver, aiosmtplib, requests and email_validator are imported where they are
+# used: a run served from cache (or only through the worker) never pays for them.
+
+# 4xx replies (greylisting, mailbox busy, service unavailable) are not final answers
+TEMPORARY_SMTP_CODES = {421, 450, 451, 452}
+
+def settle_deferred(details):
+    # Final status for a temporary failure that won't be retried any more: what the check
+    # answered before deferrals existed (timeouts were errors, 4xx replies were risky)
+    if details.startswith("SMTP Timeout"):
+        return "Error"
+    return "Risky"
+
+# Fast path for plain lowercase ASCII addresses. Anything this pattern (plus the checks in
+# check_syntax) can't settle on its own goes to the full email_validator parser.
+_ATEXT = r"a-z0-9!#$%&'*+/=?^_`{|}~-"
+_LABEL = r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?"
+_TLD = r"(?:[a-z0-9][a-z0-9-]{0,61})?[a-z]"
+FAST_EMAIL_RE = re.compile(rf"[{_ATEXT}]+(?:\.[{_ATEXT}]+)*@((?:{_LABEL}\.)+{_TLD})")
+FAST_LOCAL_RE = re.compile(rf"[{_ATEXT}]+(?:\.[{_ATEXT}]+)*")
+# Inputs containing these can't be split on the first "@" without the full parser
+_SPLIT_SPECIALS_RE = re.compile(r'["<]')
+# Mirrors email_validator.SPECIAL_USE_DOMAIN_NAMES so the fast path doesn't import it
+SPECIAL_USE_DOMAIN_NAMES = {"arpa", "invalid", "local", "localhost", "onion", "test"}
+
+def check_syntax(email):
+    # Returns (normalized_email, None) or (None, error message), exactly as
+    # validate_email(email, check_deliverability=False) would decide.
+    if email.isascii() and not _SPLIT_SPECIALS_RE.search(email):
+        match = FAST_EMAIL_RE.fullmatch(email)
+        if match:
+            domain = match.group(1)
+            if (len(email) <= 254 and "--" not in domain
+                    and domain.rsplit('.', 1)[1] not in SPECIAL_USE_DOMAIN_NAMES):
+                return email, None
+        elif "@" not in email:
+            return None, "An email address must have an @-sign."
+        elif email[0] == "@":
+            return None, "There must be something before the @-sign."
+        elif email[-1] == "@" and email.count("@") == 1 and FAST_LOCAL_RE.fullmatch(email, 0, len(email) - 1):
+            return None, "There must be something after the @-sign."
+
+    # Ambiguous or internationalized: hand off to the full parser (IDNA, Unicode normalization)
+    from email_validator import validate_email, EmailNotValidError
+    try:
+        return validate_email(email, check_deliverability=False).normalized, None
+    except EmailNotValidError as e:
+        return None, str(e)
+
+def check_syntax_batch(emails):
+    # Bulk pre-filter for large lists; same results as calling check_syntax on each address
+    return [check_syntax(email) for email in emails]
 
 class EmailValidator:
     def __init__(self, db):
         self.db = db
-        # Basic regex for fallback
-        self.regex = r'^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$'
         self.worker_url = os.getenv("VPS_WORKER_URL") # e.g., http://vps-ip:8000/verify
         self.worker_token = os.getenv("VPS_WORKER_TOKEN")
+        self.retry_scheduler = None # DeferredRetryScheduler that takes "Deferred" results
 
-    async def validate(self, email):
-        email = email.lower().strip()
-        
-        # 1. Regex/Syntax Check
-        try:
-            valid = validate_email(email)
-            email = valid.email
-        except EmailNotValidError as e:
-            return "Invalid", str(e)
+    async def validate(self, email, syntax_checked=False):
+        # syntax_checked=True: email is already the normalized address from check_syntax_batch
+        if not syntax_checked:
+            email = email.lower().strip()
+
+            # 1. Regex/Syntax Check (DNS is left to the cached MX lookup below)
+            email, error = check_syntax(email)
+            if error:
+                return "Invalid", error
 
         domain = email.split('@')[1]
 
@@ -36,27 +84,41 @@ class EmailValidator:
         if isinstance(domain_info, tuple): # cached from domain_cache
             mx_records = [domain_info[1]] if domain_info[0] else []
         else:
+            import dns.resolver
             try:
                 answers = await asyncio.to_thread(dns.resolver.resolve, domain, 'MX')
-                mx_records = sorted([str(r.exchange).strip('.') for r in answers], key=lambda x: x)
-                self.db.save_domain_cache(domain, True, mx_records[0])
+                # A null MX (RFC 7505 "0 .") strips to "" and means the domain accepts no mail
+                mx_records = sorted(mx for mx in (str(r.exchange).strip('.') for r in answers) if mx)
             except Exception:
                 self.db.save_domain_cache(domain, False, "")
                 return "Invalid", "No MX records found"
+            if not mx_records:
+                self.db.save_domain_cache(domain, False, "")
+                return "Invalid", "Domain does not accept email (null MX)"
+            self.db.save_domain_cache(domain, True, mx_records[0])
 
         if not mx_records:
             return "Invalid", "No MX records"
 
         # 4. SMTP Handshake (Deep Check)
+        status, details = await self.check_smtp(email, mx_records[0])
+        if status == "Deferred" and self.retry_scheduler:
+            # Park it with the normalized address and the MX we actually tried
+            self.retry_scheduler.defer(email, mx_records[0], details)
+        return status, details
+
+    async def check_smtp(self, email, mx_host):
         # HYBRID STRATEGY: 
         # If we are on Vercel (Port 25 blocked), we call the VPS worker.
         # Otherwise, we perform local SMTP.
+        # Temporary failures come back as "Deferred" so the caller can retry them later.
         if self.worker_url:
-            return await self._check_smtp_via_worker(email, mx_records[0])
+            return await self._check_smtp_via_worker(email, mx_host)
         else:
-            return await self._check_smtp_local(email, mx_records[0])
+            return await self._check_smtp_local(email, mx_host)
 
     async def _check_smtp_via_worker(self, email, mx_host):
+        import requests
         try:
             # We use long-polling or a simple POST to our VPS worker
             # In a real setup, this would be an async request
@@ -75,6 +137,7 @@ class EmailValidator:
             return "Valid", f"DNS Passed (SMTP Worker unreachable: {str(e)})"
 
     async def _check_smtp_local(self, email, mx_host):
+        import aiosmtplib
         try:
             async with aiosmtplib.SMTP(hostname=mx_host, port=25, timeout=10) as smtp:
                 await smtp.ehlo()
@@ -85,12 +148,22 @@ class EmailValidator:
                 code, message = await smtp.rcpt(email)
                 if code == 250:
                     return "Valid", "SMTP Verified"
-                elif code == 550:
-                    return "Invalid", "User does not exist (550)"
-                else:
-                    return "Risky", f"SMTP Response: {code} {message}"
+        except aiosmtplib.SMTPResponseException as e:
+            # aiosmtplib raises on any non-2xx reply to MAIL/RCPT
+            code, message = e.code, e.message
+            if isinstance(e, aiosmtplib.SMTPSenderRefused) and code not in TEMPORARY_SMTP_CODES:
+                return "Unknown", f"SMTP Mail From failed: {message}"
+        except (aiosmtplib.SMTPTimeoutError, asyncio.TimeoutError) as e:
+            return "Deferred", f"SMTP Timeout: {str(e)}"
         except Exception as e:
             # On Vercel, this WILL fail.
             if "WinError 10013" in str(e) or "denied" in str(e).lower():
                 return "Valid", "DNS Verified (Deep SMTP blocked locally)"
             return "Error", f"SMTP Connect failed: {str(e)}"
+
+        if code == 550:
+            return "Invalid", "User does not exist (550)"
+        elif code in TEMPORARY_SMTP_CODES:
+            return "Deferred", f"SMTP Temporary Failure: {code} {message}"
+        else:
+            return "Risky", f"SMTP Response: {code} {message}"
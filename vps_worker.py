@@ -1,10 +1,22 @@
 import asyncio
-import uvicorn
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from pydantic import BaseModel
 import aiosmtplib
+from smtp_pool import SMTPSessionPool
 
-app = FastAPI()
+# 4xx replies (greylisting, mailbox busy, service unavailable) are not final answers
+TEMPORARY_SMTP_CODES = {421, 450, 451, 452}
+
+smtp_pool = SMTPSessionPool()
+
+@asynccontextmanager
+async def lifespan(app):
+    smtp_pool.start()
+    yield
+    await smtp_pool.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 class VerifyRequest(BaseModel):
     email: str
@@ -24,22 +36,37 @@ async def verify_smtp(req: VerifyRequest):
         raise HTTPException(status_code=403, detail="Invalid Security Token")
 
     try:
-        async with aiosmtplib.SMTP(hostname=req.mx, port=25, timeout=10) as smtp:
-            await smtp.ehlo()
-            code, message = await smtp.mail("vps-verify@rocketverify.com")
-            if code != 250:
-                return {"status": "Unknown", "details": f"SMTP Mail From failed: {message}"}
-
+        # MAIL FROM is sent by the pool so it can spot sessions the server already dropped
+        async with smtp_pool.session(req.mx, "vps-verify@rocketverify.com") as smtp:
             code, message = await smtp.rcpt(req.email)
             if code == 250:
                 return {"status": "Valid", "details": "SMTP Handshake Verified (VPS)"}
-            elif code == 550:
-                return {"status": "Invalid", "details": "User does not exist (550)"}
-            else:
-                return {"status": "Risky", "details": f"SMTP Response: {code} {message}"}
+    except aiosmtplib.SMTPResponseException as e:
+        # aiosmtplib raises on any non-2xx reply to MAIL/RCPT
+        code, message = e.code, e.message
+        if isinstance(e, aiosmtplib.SMTPSenderRefused) and code not in TEMPORARY_SMTP_CODES:
+            return {"status": "Unknown", "details": f"SMTP Mail From failed: {message}"}
+    except (aiosmtplib.SMTPTimeoutError, asyncio.TimeoutError) as e:
+        # Slow or tarpitting hosts get retried later instead of failing the address
+        return {"status": "Deferred", "details": f"SMTP Timeout: {str(e)}"}
     except Exception as e:
         return {"status": "Error", "details": str(e)}
 
+    if code == 550:
+        return {"status": "Invalid", "details": "User does not exist (550)"}
+    elif code in TEMPORARY_SMTP_CODES:
+        return {"status": "Deferred", "details": f"SMTP Temporary Failure: {code} {message}"}
+    else:
+        return {"status": "Risky", "details": f"SMTP Response: {code} {message}"}
+
+@app.get("/pool/stats")
+async def pool_stats(x_worker_token: str = Header()):
+    # Header rather than query string so the secret stays out of access and proxy logs
+    if x_worker_token != SECURE_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid Security Token")
+    return smtp_pool.stats()
+
 if __name__ == "__main__":
+    import uvicorn
     print(f"RocketVerify VPS Worker starting... Ensuring Port 25 is open.")
     uvicorn.run(app, host="0.0.0.0", port=8000)